@@ -4,6 +4,7 @@ from torchvision.datasets import CIFAR10
 
 from pl_bolts.datamodules.bolts_dataloaders_base import BoltDataModule
 from pl_bolts.transforms.dataset_normalizations import cifar10_normalization
+from pl_bolts.utils.dataloader_utils import worker_kwargs
 
 
 class CIFAR10DataLoaders(BoltDataModule):
@@ -35,7 +36,8 @@ class CIFAR10DataLoaders(BoltDataModule):
             shuffle=True,
             num_workers=self.num_workers,
             drop_last=True,
-            pin_memory=True
+            pin_memory=True,
+            **worker_kwargs(self.num_workers)
         )
         return loader
 
@@ -51,7 +53,8 @@ class CIFAR10DataLoaders(BoltDataModule):
             batch_size=batch_size,
             shuffle=False,
             num_workers=self.num_workers,
-            pin_memory=True
+            pin_memory=True,
+            **worker_kwargs(self.num_workers)
         )
         return loader
 
@@ -66,7 +69,8 @@ class CIFAR10DataLoaders(BoltDataModule):
             shuffle=False,
             num_workers=self.num_workers,
             drop_last=True,
-            pin_memory=True
+            pin_memory=True,
+            **worker_kwargs(self.num_workers)
         )
         return loader
 
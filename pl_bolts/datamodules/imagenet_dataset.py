@@ -9,7 +9,6 @@ from contextlib import contextmanager
 
 import torch
 from sklearn.utils import shuffle
-from torch._six import PY3
 from torchvision.datasets import ImageNet
 from torchvision.datasets.imagenet import load_meta_file
 
@@ -230,7 +229,7 @@ def extract_archive(from_path, to_path=None, remove_finished=False):
     elif _is_targz(from_path):
         with tarfile.open(from_path, 'r:gz') as tar:
             tar.extractall(path=to_path)
-    elif _is_tarxz(from_path) and PY3:
+    elif _is_tarxz(from_path):
         # .tar.xz archive only supported in Python 3.x
         with tarfile.open(from_path, 'r:xz') as tar:
             tar.extractall(path=to_path)
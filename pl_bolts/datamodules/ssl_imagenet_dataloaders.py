@@ -6,6 +6,7 @@ from torchvision import transforms as transform_lib
 from pl_bolts.datamodules.bolts_dataloaders_base import BoltDataModule
 from pl_bolts.datamodules.imagenet_dataset import UnlabeledImagenet
 from pl_bolts.transforms.dataset_normalizations import imagenet_normalization
+from pl_bolts.utils.dataloader_utils import worker_kwargs
 
 
 class SSLImagenetDataLoaders(BoltDataModule):
@@ -69,7 +70,8 @@ class SSLImagenetDataLoaders(BoltDataModule):
             shuffle=True,
             num_workers=self.num_workers,
             drop_last=True,
-            pin_memory=True
+            pin_memory=True,
+            **worker_kwargs(self.num_workers)
         )
         return loader
 
@@ -87,7 +89,8 @@ class SSLImagenetDataLoaders(BoltDataModule):
             batch_size=batch_size,
             shuffle=False,
             num_workers=self.num_workers,
-            pin_memory=True
+            pin_memory=True,
+            **worker_kwargs(self.num_workers)
         )
         return loader
 
@@ -106,7 +109,8 @@ class SSLImagenetDataLoaders(BoltDataModule):
             shuffle=False,
             num_workers=self.num_workers,
             drop_last=True,
-            pin_memory=True
+            pin_memory=True,
+            **worker_kwargs(self.num_workers)
         )
         return loader
 
@@ -5,6 +5,7 @@ from torchvision.datasets import STL10
 from pl_bolts.datamodules.bolts_dataloaders_base import BoltDataModule
 from pl_bolts.datamodules.concat_dataset import ConcatDataset
 from pl_bolts.transforms.dataset_normalizations import stl10_normalization
+from pl_bolts.utils.dataloader_utils import worker_kwargs
 
 
 class STL10DataLoaders(BoltDataModule):
@@ -40,7 +41,8 @@ class STL10DataLoaders(BoltDataModule):
             shuffle=True,
             num_workers=self.num_workers,
             drop_last=True,
-            pin_memory=True
+            pin_memory=True,
+            **worker_kwargs(self.num_workers)
         )
         return loader
 
@@ -70,7 +72,8 @@ class STL10DataLoaders(BoltDataModule):
             shuffle=True,
             num_workers=self.num_workers,
             drop_last=True,
-            pin_memory=True
+            pin_memory=True,
+            **worker_kwargs(self.num_workers)
         )
         return loader
 
@@ -88,7 +91,8 @@ class STL10DataLoaders(BoltDataModule):
             batch_size=batch_size,
             shuffle=False,
             num_workers=self.num_workers,
-            pin_memory=True
+            pin_memory=True,
+            **worker_kwargs(self.num_workers)
         )
         return loader
 
@@ -118,7 +122,8 @@ class STL10DataLoaders(BoltDataModule):
             shuffle=False,
             num_workers=self.num_workers,
             drop_last=True,
-            pin_memory=True
+            pin_memory=True,
+            **worker_kwargs(self.num_workers)
         )
         return loader
 
@@ -133,7 +138,8 @@ class STL10DataLoaders(BoltDataModule):
             batch_size=batch_size,
             shuffle=False,
             num_workers=self.num_workers,
-            pin_memory=True
+            pin_memory=True,
+            **worker_kwargs(self.num_workers)
         )
         return loader
 
@@ -148,7 +154,8 @@ class STL10DataLoaders(BoltDataModule):
             shuffle=False,
             num_workers=self.num_workers,
             drop_last=True,
-            pin_memory=True
+            pin_memory=True,
+            **worker_kwargs(self.num_workers)
         )
         return loader
 
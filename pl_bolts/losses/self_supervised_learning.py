@@ -68,7 +68,8 @@ class CPCTask(nn.Module):
         labels = labels.to(logits.device)
         labels = labels.long()
 
-        loss = nn.functional.cross_entropy(logits, labels)
+        # under mixed precision the logits are half precision, keep the softmax in fp32
+        loss = nn.functional.cross_entropy(logits.float(), labels)
         return loss
 
     def forward(self, Z):
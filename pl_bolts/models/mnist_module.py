@@ -15,6 +15,7 @@ Fit as follows
 .. code-block:: python
 
     import pytorch_lightning as pl
+    import torch
     from pl_bolts.models import LitMNISTModel
     from argparse import ArgumentParser
 
@@ -25,6 +26,10 @@ Fit as follows
     # model
     model = LitMNISTModel(hparams=args)
 
+    # optional (torch>=2.0): the MLP is tiny so dispatch overhead dominates, compiling fuses it.
+    # Compile forward only, the training/validation steps call self.log which dynamo cannot trace
+    # model.forward = torch.compile(model.forward, mode='reduce-overhead', fullgraph=True)
+
     # train
     trainer = pl.Trainer()
     trainer.fit(model)
@@ -72,19 +77,21 @@ then it makes sense to define the datasets outside of the LightningModule.
     trainer.test(test_dataloaders=test_loader)
 
 """
-import os
 from argparse import ArgumentParser
 
 import torch
 from pytorch_lightning import LightningModule, Trainer
 from torch.nn import functional as F
-from torch.utils.data import DataLoader, random_split
+from torch.utils.data import DataLoader, TensorDataset
 from torchvision import transforms
 from torchvision.datasets import MNIST
 
+from pl_bolts.utils.dataloader_utils import worker_kwargs
+from pl_bolts.utils.optimizer_utils import fused_adam_kwargs
+
 
 class LitMNISTModel(LightningModule):
-    def __init__(self, hidden_dim=128, learning_rate=1e-3, batch_size=32, num_workers=4, data_dir=''):
+    def __init__(self, hidden_dim=128, learning_rate=1e-3, batch_size=32, num_workers=0, data_dir=''):
         super().__init__()
         self.save_hyperparameters()
 
@@ -95,81 +102,77 @@ class LitMNISTModel(LightningModule):
         self.mnist_val = None
 
     def forward(self, x):
-        x = x.view(x.size(0), -1)
+        x = x.flatten(1)
         x = torch.relu(self.l1(x))
-        x = torch.relu(self.l2(x))
+        x = self.l2(x)
         return x
 
     def training_step(self, batch, batch_idx):
         x, y = batch
         y_hat = self(x)
         loss = F.cross_entropy(y_hat, y)
-        tensorboard_logs = {'train_loss': loss}
-        progress_bar_metrics = tensorboard_logs
-        return {
-            'loss': loss,
-            'log': tensorboard_logs,
-            'progress_bar': progress_bar_metrics
-        }
+        self.log('train_loss', loss, prog_bar=True)
+        return loss
 
     def validation_step(self, batch, batch_idx):
         x, y = batch
         y_hat = self(x)
-        return {'val_loss': F.cross_entropy(y_hat, y)}
-
-    def validation_epoch_end(self, outputs):
-        avg_loss = torch.stack([x['val_loss'] for x in outputs]).mean()
-        tensorboard_logs = {'val_loss': avg_loss}
-        progress_bar_metrics = tensorboard_logs
-        return {
-            'avg_val_loss': avg_loss,
-            'log': tensorboard_logs,
-            'progress_bar': progress_bar_metrics
-        }
+        # accumulated into a running mean across batches and synced across processes by Lightning
+        self.log('val_loss', F.cross_entropy(y_hat, y), prog_bar=True, on_epoch=True, sync_dist=True)
 
     def test_step(self, batch, batch_idx):
         x, y = batch
         y_hat = self(x)
-        return {'test_loss': F.cross_entropy(y_hat, y)}
-
-    def test_epoch_end(self, outputs):
-        avg_loss = torch.stack([x['test_loss'] for x in outputs]).mean()
-        tensorboard_logs = {'test_loss': avg_loss}
-        progress_bar_metrics = tensorboard_logs
-        return {
-            'avg_test_loss': avg_loss,
-            'log': tensorboard_logs,
-            'progress_bar': progress_bar_metrics
-        }
+        self.log('test_loss', F.cross_entropy(y_hat, y), prog_bar=True, on_epoch=True, sync_dist=True)
 
     def configure_optimizers(self):
-        return torch.optim.Adam(self.parameters(), lr=self.hparams.learning_rate)
+        return torch.optim.Adam(self.parameters(), lr=self.hparams.learning_rate,
+                                **fused_adam_kwargs(self.device, self.trainer.gradient_clip_val))
 
     def prepare_data(self):
         MNIST(self.hparams.data_dir, train=True, download=True, transform=transforms.ToTensor())
+        MNIST(self.hparams.data_dir, train=False, download=True, transform=transforms.ToTensor())
+
+    def setup(self, stage=None):
+        # the test split is loaded separately, and the train/val splits only need to be built once
+        if stage == 'test' or self.mnist_train is not None:
+            return
+
+        # MNIST fits in memory, so convert all the images to a tensor once instead of per sample
+        dataset = MNIST(self.hparams.data_dir, train=True, download=False, transform=None)
+        images = dataset.data.unsqueeze(1).float().div_(255.)
+        targets = dataset.targets
+
+        # seeded so the split is reproducible and identical across processes
+        generator = torch.Generator().manual_seed(42)
+        indices = torch.randperm(len(images), generator=generator)
+        train_idx, val_idx = indices[:55000], indices[55000:]
+
+        # gather each split once so sample lookups index the tensors directly
+        self.mnist_train = TensorDataset(images[train_idx], targets[train_idx])
+        self.mnist_val = TensorDataset(images[val_idx], targets[val_idx])
 
     def train_dataloader(self):
-        dataset = MNIST(self.hparams.data_dir, train=True, download=False, transform=transforms.ToTensor())
-        mnist_train, _ = random_split(dataset, [55000, 5000])
-        loader = DataLoader(mnist_train, batch_size=self.hparams.batch_size, num_workers=self.hparams.num_workers)
+        loader = DataLoader(self.mnist_train, batch_size=self.hparams.batch_size, num_workers=self.hparams.num_workers,
+                            pin_memory=True, **worker_kwargs(self.hparams.num_workers))
         return loader
 
     def val_dataloader(self):
-        dataset = MNIST(self.hparams.data_dir, train=True, download=False, transform=transforms.ToTensor())
-        _, mnist_val = random_split(dataset, [55000, 5000])
-        loader = DataLoader(mnist_val, batch_size=self.hparams.batch_size, num_workers=self.hparams.num_workers)
+        loader = DataLoader(self.mnist_val, batch_size=self.hparams.batch_size, num_workers=self.hparams.num_workers,
+                            pin_memory=True, **worker_kwargs(self.hparams.num_workers))
         return loader
 
     def test_dataloader(self):
-        test_dataset = MNIST(os.getcwd(), train=False, download=True, transform=transforms.ToTensor())
-        loader = DataLoader(test_dataset, batch_size=self.hparams.batch_size, num_workers=self.hparams.num_workers)
+        test_dataset = MNIST(self.hparams.data_dir, train=False, download=False, transform=transforms.ToTensor())
+        loader = DataLoader(test_dataset, batch_size=self.hparams.batch_size, num_workers=self.hparams.num_workers,
+                            pin_memory=True, **worker_kwargs(self.hparams.num_workers))
         return loader
 
     @staticmethod
     def add_model_specific_args(parent_parser):
         parser = ArgumentParser(parents=[parent_parser], add_help=False)
         parser.add_argument('--batch_size', type=int, default=32)
-        parser.add_argument('--num_workers', type=int, default=4)
+        parser.add_argument('--num_workers', type=int, default=0)
         parser.add_argument('--hidden_dim', type=int, default=128)
         parser.add_argument('--data_dir', type=str, default='')
         parser.add_argument('--learning_rate', type=float, default=0.0001)
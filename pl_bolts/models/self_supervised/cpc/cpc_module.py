@@ -2,12 +2,12 @@
 CPC V2
 ======
 """
-import math
 from argparse import ArgumentParser
 
 import pytorch_lightning as pl
 import pytorch_lightning
 import torch
+from torch import nn
 from torchvision import models
 import torch.nn.functional as F
 import torch.optim as optim
@@ -19,7 +19,8 @@ from pl_bolts.datamodules.ssl_imagenet_dataloaders import SSLImagenetDataLoaders
 from pl_bolts.losses.self_supervised_learning import CPCTask
 from pl_bolts.models.self_supervised.cpc import transforms as cpc_transforms
 from pl_bolts.models.self_supervised.cpc.networks import CPCResNet101
-from pl_bolts.models.self_supervised.evaluator import SSLEvaluator
+from pl_bolts.models.self_supervised.cpc.prefetcher import CPCDataPrefetcher
+from pl_bolts.utils.optimizer_utils import fused_adam_kwargs
 from pl_bolts.utils.ssl_utils import torchvision_ssl_encoder
 from pl_bolts.utils.pretrained_weights import load_pretrained
 from pytorch_lightning.utilities import rank_zero_warn
@@ -68,6 +69,18 @@ class CPCV2(pl.LightningModule):
             trainer = Trainer()
             trainer.fit(model)
 
+            # the encoders are conv heavy, mixed precision cuts step time and activation memory
+            trainer = Trainer(gpus=1, precision=16)
+            # or bf16 (Lightning>=1.5) on Ampere or newer GPUs, which needs no loss scaling
+            trainer = Trainer(gpus=1, precision='bf16')
+            trainer.fit(model)
+
+            # optional (torch>=2.0): the patch grid is static, so compiling with static shapes
+            # folds the patch flattening into the first conv. Compile forward only, the
+            # training/validation steps call self.log which dynamo cannot trace
+            model.forward = torch.compile(model.forward, dynamic=False)
+            trainer.fit(model)
+
         Some uses::
 
             # load resnet18 pretrained using CPC on imagenet
@@ -114,33 +127,47 @@ class CPCV2(pl.LightningModule):
         if isinstance(encoder, str):
             self.encoder = self.init_encoder()
 
+        # only the original CPC encoder returns a tensor, the rest return a list of feature maps.
+        # resolve it once so forward has no string compare
+        self._encoder_returns_list = self.hparams.encoder != 'cpc_encoder'
+
+        # the patch grid only depends on the image and patch sizes
+        image_size = self.get_image_size(self.hparams.dataset)
+        self._nb_feats = self.__compute_nb_feats(image_size)
+
         # info nce loss
-        c, h = self.__compute_final_nb_c(self.hparams.patch_size)
+        c = self.__compute_final_c(self.hparams.patch_size)
         self.info_nce = CPCTask(num_input_channels=c, target_dim=64, embed_scale=0.1)
 
+        # NHWC convolutions make better use of tensor cores
+        self.encoder = self.encoder.to(memory_format=torch.channels_last)
+
         if self.online_evaluator:
-            z_dim = c * h * h
+            # pool the feature grid first, so the first layer is (c, 1024) instead of (c * h * w, 1024)
             num_classes = self.dataset.num_classes
-            self.non_linear_evaluator = SSLEvaluator(
-                n_input=z_dim,
-                n_classes=num_classes,
-                p=0.2,
-                n_hidden=1024
+            self.non_linear_evaluator = nn.Sequential(
+                nn.AdaptiveAvgPool2d(1),
+                nn.Flatten(),
+                nn.Dropout(p=0.2),
+                nn.Linear(c, 1024),
+                nn.ReLU(),
+                nn.Linear(1024, num_classes)
             )
 
     def load_pretrained(self, pretrained):
         available_weights = {'resnet18'}
 
         if pretrained in available_weights:
-            load_pretrained(self, f'CPCV2-{pretrained}')
+            # the published weights predate the pooled online evaluator, which is retrained online anyway
+            load_pretrained(self, f'CPCV2-{pretrained}', ignore_prefixes=['non_linear_evaluator.'])
         elif available_weights not in available_weights:
             rank_zero_warn(f'{pretrained} not yet available')
 
     def init_encoder(self):
-        dummy_batch = torch.zeros((2, 3, self.hparams.patch_size, self.hparams.patch_size))
-
         encoder_name = self.hparams.encoder
         if encoder_name == 'cpc_encoder':
+            # the layer norms are sized from a sample batch
+            dummy_batch = torch.zeros((2, 3, self.hparams.patch_size, self.hparams.patch_size))
             return CPCResNet101(dummy_batch)
         else:
             return torchvision_ssl_encoder(encoder_name, return_all_feature_maps=self.hparams.amdim_task)
@@ -158,25 +185,40 @@ class CPCV2(pl.LightningModule):
             raise FileNotFoundError(f'the {name} dataset is not supported. Subclass \'get_dataset to provide'
                                     f'your own \'')
 
-    def __compute_final_nb_c(self, patch_size):
-        dummy_batch = torch.zeros((2 * 49, 3, patch_size, patch_size))
-        dummy_batch = self.encoder(dummy_batch)
+    def get_image_size(self, name):
+        # size of the (cropped) images the CPC transforms produce for each dataset
+        image_sizes = {'cifar10': 32, 'stl10': 64, 'imagenet128': 128}
+        if name not in image_sizes:
+            raise FileNotFoundError(f'the {name} dataset is not supported. Subclass \'get_image_size\' to provide'
+                                    f' the image size of your own dataset')
+
+        return image_sizes[name]
+
+    def __compute_nb_feats(self, image_size):
+        # number of patches along each side, same arithmetic as Patchify
+        stride = self.hparams.patch_size - self.hparams.patch_overlap
+        return (image_size - self.hparams.patch_size) // stride + 1
+
+    def __compute_final_c(self, patch_size):
+        # only the feature size is unknown, 2 patches are enough to find it (1 breaks batchnorm)
+        dummy_batch = torch.zeros((2, 3, patch_size, patch_size))
+        with torch.no_grad():
+            dummy_batch = self.encoder(dummy_batch)
 
         # other encoders return a list
-        if self.hparams.encoder != 'cpc_encoder':
+        if self._encoder_returns_list:
             dummy_batch = dummy_batch[0]
 
-        dummy_batch = self.__recover_z_shape(dummy_batch, 2)
-        b, c, h, w = dummy_batch.size()
-        return c, h
+        # __recover_z_shape flattens each patch's (c, h, w) feature map into the channel dim
+        return dummy_batch.flatten(1).size(1)
 
     def __recover_z_shape(self, Z, b):
         # recover shape
-        Z = Z.squeeze(-1)
-        nb_feats = int(math.sqrt(Z.size(0) // b))
-        Z = Z.view(b, -1, Z.size(1))
-        Z = Z.permute(0, 2, 1).contiguous()
-        Z = Z.view(b, -1, nb_feats, nb_feats)
+        # the patches are already laid out row by row, so (b * p, c, h, w) -> (b, nb_feats, nb_feats, c * h * w)
+        # is free and a single permute gives (b, c * h * w, nb_feats, nb_feats) without copying
+        nb_feats = self._nb_feats
+        Z = Z.reshape(b, nb_feats, nb_feats, -1)
+        Z = Z.permute(0, 3, 1, 2)
 
         return Z
 
@@ -184,12 +226,13 @@ class CPCV2(pl.LightningModule):
         # put all patches on the batch dim for simultaneous processing
         b, p, c, w, h = img_1.size()
         img_1 = img_1.view(-1, c, w, h)
+        img_1 = img_1.contiguous(memory_format=torch.channels_last)
 
         # Z are the latent vars
         Z = self.encoder(img_1)
 
         # non cpc resnets return a list
-        if self.hparams.encoder != 'cpc_encoder':
+        if self._encoder_returns_list:
             Z = Z[0]
 
         # (?) -> (b, -1, nb_feats, nb_feats)
@@ -212,31 +255,26 @@ class CPCV2(pl.LightningModule):
         # infoNCE loss
         nce_loss = self.info_nce(Z)
         loss = nce_loss
-        log = {'train_nce_loss': nce_loss}
+        self.log('train_nce_loss', nce_loss)
 
         # don't use the training signal, just finetune the MLP to see how we're doing downstream
         if self.online_evaluator:
+            # only STL10 fine-tunes on a different (labeled) batch, everywhere else reuse the features
             if self.hparams.dataset == 'stl10':
                 img_1, y = labeled_batch
 
-            with torch.no_grad():
-                Z = self(img_1)
+                with torch.no_grad():
+                    Z = self(img_1)
 
             # just in case... no grads into unsupervised part!
             z_in = Z.detach()
 
-            z_in = z_in.reshape(Z.size(0), -1)
             mlp_preds = self.non_linear_evaluator(z_in)
             mlp_loss = F.cross_entropy(mlp_preds, y)
             loss = nce_loss + mlp_loss
-            log['train_mlp_loss'] = mlp_loss
-
-        result = {
-            'loss': loss,
-            'log': log
-        }
+            self.log('train_mlp_loss', mlp_loss)
 
-        return result
+        return loss
 
     def validation_step(self, batch, batch_nb):
 
@@ -254,33 +292,22 @@ class CPCV2(pl.LightningModule):
 
         # infoNCE loss
         nce_loss = self.info_nce(Z)
-        result = {'val_nce': nce_loss}
+        log = {'val_nce_loss': nce_loss}
 
         if self.online_evaluator:
             if self.hparams.dataset == 'stl10':
                 img_1, y = labeled_batch
                 Z = self(img_1)
 
-            z_in = Z.reshape(Z.size(0), -1)
-            mlp_preds = self.non_linear_evaluator(z_in)
+            mlp_preds = self.non_linear_evaluator(Z)
             mlp_loss = F.cross_entropy(mlp_preds, y)
             acc = metrics.accuracy(mlp_preds, y)
-            result['mlp_acc'] = acc
-            result['mlp_loss'] = mlp_loss
-
-        return result
-
-    def validation_epoch_end(self, outputs):
-        val_nce = metrics.mean(outputs, 'val_nce')
 
-        log = {'val_nce_loss': val_nce}
-        if self.online_evaluator:
-            mlp_acc = metrics.mean(outputs, 'mlp_acc')
-            mlp_loss = metrics.mean(outputs, 'mlp_loss')
-            log['val_mlp_acc'] = mlp_acc
+            # accuracy is computed on the cpu, the all reduce needs it on the same device as the losses
+            log['val_mlp_acc'] = acc.type_as(mlp_loss)
             log['val_mlp_loss'] = mlp_loss
 
-        return {'val_loss': val_nce, 'log': log, 'progress_bar': log}
+        self.log_dict(log, prog_bar=True, sync_dist=True)
 
     def configure_optimizers(self):
         opt = optim.Adam(
@@ -288,7 +315,8 @@ class CPCV2(pl.LightningModule):
             lr=self.hparams.learning_rate,
             betas=(0.8, 0.999),
             weight_decay=1e-5,
-            eps=1e-7
+            eps=1e-7,
+            **fused_adam_kwargs(self.device, self.trainer.gradient_clip_val)
         )
 
         if self.hparams.dataset in ['cifar10', 'stl10']:
@@ -304,7 +332,10 @@ class CPCV2(pl.LightningModule):
     def train_dataloader(self):
         loader = None
         if self.hparams.dataset == 'cifar10':
-            train_transform = cpc_transforms.CPCTransformsCIFAR10()
+            train_transform = cpc_transforms.CPCTransformsCIFAR10(
+                patch_size=self.hparams.patch_size,
+                overlap=self.hparams.patch_overlap
+            )
 
         elif self.hparams.dataset == 'stl10':
             stl10_transform = cpc_transforms.CPCTransformsSTL10Patches(
@@ -323,12 +354,18 @@ class CPCV2(pl.LightningModule):
 
         if loader is None:
             loader = self.dataset.train_dataloader(self.hparams.batch_size, transforms=train_transform)
+
+        loader = self.__prefetch_to_gpu(loader)
         return loader
 
     def val_dataloader(self):
         loader = None
         if self.hparams.dataset == 'cifar10':
-            test_transform = cpc_transforms.CPCTransformsCIFAR10().test_transform
+            test_transform = cpc_transforms.CPCTransformsCIFAR10(
+                patch_size=self.hparams.patch_size,
+                overlap=self.hparams.patch_overlap
+            )
+            test_transform = test_transform.test_transform
 
         if self.hparams.dataset == 'stl10':
             stl10_transform = cpc_transforms.CPCTransformsSTL10Patches(
@@ -348,6 +385,14 @@ class CPCV2(pl.LightningModule):
         if loader is None:
             loader = self.dataset.val_dataloader(self.hparams.batch_size, transforms=test_transform)
 
+        loader = self.__prefetch_to_gpu(loader)
+        return loader
+
+    def __prefetch_to_gpu(self, loader):
+        # overlap the host to device copy of the next batch with the current step
+        if self.device.type == 'cuda':
+            loader = CPCDataPrefetcher.from_loader(loader)
+
         return loader
 
     @staticmethod
@@ -428,12 +473,28 @@ class CPCV2(pl.LightningModule):
         return parser
 
 
+def _bf16_available():
+    # precision='bf16' was added in Lightning 1.5 and needs an Ampere or newer GPU
+    lightning_version = tuple(int(v) for v in pl.__version__.split('.')[:2])
+    if lightning_version < (1, 5) or not torch.cuda.is_available():
+        return False
+
+    return torch.cuda.is_bf16_supported()
+
+
 if __name__ == '__main__':
     pl.seed_everything(1234)
     parser = ArgumentParser()
     parser = pl.Trainer.add_argparse_args(parser)
     parser = CPCV2.add_model_specific_args(parser)
 
+    # default to native mixed precision when it is available. bf16 keeps the fp32 exponent range,
+    # so it needs no loss scaling, native fp16 AMP is the fallback on older GPUs
+    if _bf16_available():
+        parser.set_defaults(precision='bf16')
+    elif torch.cuda.is_available() and hasattr(torch.cuda, 'amp'):
+        parser.set_defaults(precision=16)
+
     args = parser.parse_args()
     args.online_ft = True
 
@@ -0,0 +1,68 @@
+import torch
+from torch.utils.data import DataLoader
+
+
+class CPCDataPrefetcher(DataLoader):
+    """
+    DataLoader which copies the next batch to the current GPU on a side stream while the current batch
+    is being processed, so the host to device copy of the (many) CPC patches overlaps with compute.
+
+    Without CUDA it behaves exactly like a regular :class:`~torch.utils.data.DataLoader`.
+
+    Example::
+
+        loader = DataLoader(dataset, batch_size=32, pin_memory=True)
+        loader = CPCDataPrefetcher.from_loader(loader)
+    """
+
+    @classmethod
+    def from_loader(cls, loader: DataLoader) -> 'CPCDataPrefetcher':
+        # same rebuild Lightning uses when it replaces samplers
+        skip_keys = ['batch_sampler', 'dataset_kind']
+        loader_args = {k: v for k, v in loader.__dict__.items() if not k.startswith('_') and k not in skip_keys}
+        return cls(**loader_args)
+
+    def __iter__(self):
+        iterator = super().__iter__()
+
+        if not torch.cuda.is_available():
+            yield from iterator
+            return
+
+        device = torch.device('cuda', torch.cuda.current_device())
+        stream = torch.cuda.Stream(device)
+
+        next_batch = self._preload(iterator, stream, device)
+        while next_batch is not None:
+            current_stream = torch.cuda.current_stream(device)
+            current_stream.wait_stream(stream)
+
+            # the tensors were allocated on the side stream, tell the allocator they are used on this one
+            batch = next_batch
+            _apply_to_tensors(batch, lambda t: t.record_stream(current_stream))
+
+            next_batch = self._preload(iterator, stream, device)
+            yield batch
+
+    @staticmethod
+    def _preload(iterator, stream, device):
+        try:
+            batch = next(iterator)
+        except StopIteration:
+            return None
+
+        with torch.cuda.stream(stream):
+            return _apply_to_tensors(batch, lambda t: t.to(device, non_blocking=True))
+
+
+def _apply_to_tensors(data, fn):
+    """
+    Applies ``fn`` to every tensor in a (nested) batch of tuples, lists and dicts.
+    """
+    if isinstance(data, torch.Tensor):
+        return fn(data)
+    if isinstance(data, (list, tuple)):
+        return type(data)(_apply_to_tensors(d, fn) for d in data)
+    if isinstance(data, dict):
+        return {k: _apply_to_tensors(v, fn) for k, v in data.items()}
+    return data
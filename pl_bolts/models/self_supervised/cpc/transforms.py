@@ -8,7 +8,10 @@ class CPCTransformsCIFAR10:
     Apply the same input transform twice, with independent randomness.
     '''
 
-    def __init__(self, patch_size=8):
+    def __init__(self, patch_size=8, overlap=None):
+        if overlap is None:
+            overlap = patch_size // 2
+
         # flipping image along vertical axis
         self.flip_lr = transforms.RandomHorizontalFlip(p=0.5)
         # image augmentation functions
@@ -26,13 +29,13 @@ class CPCTransformsCIFAR10:
             rnd_gray,
             transforms.ToTensor(),
             normalize,
-            Patchify(patch_size=patch_size, overlap_size=patch_size // 2),
+            Patchify(patch_size=patch_size, overlap_size=overlap),
         ])
         # transform for testing
         self.test_transform = transforms.Compose([
             transforms.ToTensor(),
             normalize,
-            Patchify(patch_size=patch_size, overlap_size=patch_size // 2),
+            Patchify(patch_size=patch_size, overlap_size=overlap),
         ])
 
     def __call__(self, inp):
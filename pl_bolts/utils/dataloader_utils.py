@@ -0,0 +1,23 @@
+import inspect
+
+from torch.utils.data import DataLoader
+
+# persistent_workers and prefetch_factor were added in torch 1.7
+_WORKER_KWARGS_AVAILABLE = 'persistent_workers' in inspect.signature(DataLoader.__init__).parameters
+
+
+def worker_kwargs(num_workers, prefetch_factor=4):
+    """
+    Extra DataLoader arguments which keep the worker processes alive across epochs (instead of forking
+    them again every epoch) and let each worker prepare more batches ahead of time.
+
+    Returns an empty dict when there are no workers or the installed torch does not support them.
+
+    Example::
+
+        loader = DataLoader(dataset, num_workers=num_workers, **worker_kwargs(num_workers))
+    """
+    if num_workers == 0 or not _WORKER_KWARGS_AVAILABLE:
+        return {}
+
+    return {'persistent_workers': True, 'prefetch_factor': prefetch_factor}
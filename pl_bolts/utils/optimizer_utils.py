@@ -0,0 +1,29 @@
+import inspect
+
+import torch
+from torch import optim
+
+_ADAM_PARAMETERS = inspect.signature(optim.Adam.__init__).parameters
+
+
+def fused_adam_kwargs(device, gradient_clip_val=None):
+    """
+    Extra Adam arguments which replace the per-parameter update kernels with a few multi-tensor kernels.
+
+    ``fused=True`` (torch 1.13) needs the parameters on a GPU, otherwise the ``foreach`` implementation (torch 1.12)
+    is used. The fused optimizer unscales the gradients itself, so Lightning cannot clip them under 16-bit
+    precision; ``foreach`` is used whenever gradient clipping is configured. Returns an empty dict on older
+    versions of torch.
+
+    Example::
+
+        opt = optim.Adam(self.parameters(), lr=1e-3,
+                         **fused_adam_kwargs(self.device, self.trainer.gradient_clip_val))
+    """
+    if 'fused' in _ADAM_PARAMETERS and torch.device(device).type == 'cuda' and not gradient_clip_val:
+        return {'fused': True}
+
+    if 'foreach' in _ADAM_PARAMETERS:
+        return {'foreach': True}
+
+    return {}
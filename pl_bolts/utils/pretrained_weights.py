@@ -1,14 +1,35 @@
+import inspect
 
+import torch
 
 urls = {
     'vae-imagenet': 'https://pl-bolts-weights.s3.us-east-2.amazonaws.com/vae/version_0/checkpoints/epoch%3D2.ckpt',
     'CPCV2-resnet18': 'https://pl-bolts-weights.s3.us-east-2.amazonaws.com/cpc/resnet18_version_6/checkpoints/epoch%3D85.ckpt'
 }
 
+# file_name was added in torch 1.7
+_HUB_FILE_NAME_AVAILABLE = 'file_name' in inspect.signature(torch.hub.load_state_dict_from_url).parameters
 
-def load_pretrained(model, class_name=None):
+
+def load_pretrained(model, class_name=None, ignore_prefixes=()):
+    """
+    Loads the published weights into ``model``. Keys starting with any of ``ignore_prefixes`` are skipped in
+    the checkpoint and left at their initial values in the model, every other key must match.
+    """
     if class_name is None:
         class_name = model.__class__.__name__
     ckpt_url = urls[class_name]
-    weights_model = model.__class__.load_from_checkpoint(ckpt_url)
-    model.load_state_dict(weights_model.state_dict())
\ No newline at end of file
+    ignore_prefixes = tuple(ignore_prefixes)
+
+    # load the weights straight into the model instead of building a second model from the checkpoint,
+    # torch.hub also caches the download. The urls end in generic names like epoch%3D2.ckpt, so cache
+    # each one under its class name instead to keep different checkpoints from overwriting each other
+    hub_kwargs = {'file_name': f'{class_name}.ckpt'} if _HUB_FILE_NAME_AVAILABLE else {}
+    ckpt = torch.hub.load_state_dict_from_url(ckpt_url, map_location='cpu', **hub_kwargs)
+    state_dict = {k: v for k, v in ckpt['state_dict'].items() if not k.startswith(ignore_prefixes)}
+
+    missing_keys, unexpected_keys = model.load_state_dict(state_dict, strict=False)
+    missing_keys = [k for k in missing_keys if not k.startswith(ignore_prefixes)]
+    if missing_keys or unexpected_keys:
+        raise RuntimeError(f'the {class_name} weights do not match the model. '
+                           f'Missing keys: {missing_keys}, unexpected keys: {unexpected_keys}')
@@ -0,0 +1,65 @@
+import pytest
+import torch
+from torch.utils.data import DataLoader, SequentialSampler, TensorDataset
+from torch.utils.data.dataloader import default_collate
+
+from pl_bolts.models.self_supervised.cpc.prefetcher import CPCDataPrefetcher, _apply_to_tensors
+from pl_bolts.utils.dataloader_utils import worker_kwargs
+from tests import reset_seed
+
+
+def _collate(batch):
+    return default_collate(batch)
+
+
+def test_cpc_prefetcher_from_loader():
+    reset_seed()
+
+    dataset = TensorDataset(torch.rand(10, 3), torch.arange(10))
+    loader = DataLoader(dataset, batch_size=3, sampler=SequentialSampler(dataset), drop_last=True,
+                        collate_fn=_collate, num_workers=2, **worker_kwargs(2))
+    prefetcher = CPCDataPrefetcher.from_loader(loader)
+
+    assert isinstance(prefetcher, CPCDataPrefetcher)
+    assert prefetcher.batch_size == loader.batch_size
+    assert prefetcher.sampler is loader.sampler
+    assert prefetcher.drop_last == loader.drop_last
+    assert prefetcher.collate_fn is loader.collate_fn
+    assert prefetcher.num_workers == loader.num_workers
+    for key in worker_kwargs(2):
+        assert getattr(prefetcher, key) == getattr(loader, key)
+
+    batches = list(prefetcher)
+    expected = list(loader)
+    assert len(batches) == len(expected) == len(prefetcher) == 3
+
+    for (x, y), (expected_x, expected_y) in zip(batches, expected):
+        # without cuda the prefetcher is a plain passthrough
+        if not torch.cuda.is_available():
+            assert x.device.type == 'cpu'
+
+        assert torch.equal(x.cpu(), expected_x)
+        assert torch.equal(y.cpu(), expected_y)
+
+
+@pytest.mark.skipif(not torch.cuda.is_available(), reason='test requires a GPU')
+def test_cpc_prefetcher_copies_to_gpu():
+    reset_seed()
+
+    dataset = TensorDataset(torch.rand(10, 3), torch.arange(10))
+    prefetcher = CPCDataPrefetcher(dataset, batch_size=3, pin_memory=True)
+
+    for x, y in prefetcher:
+        assert x.is_cuda
+        assert y.is_cuda
+
+
+def test_apply_to_tensors_keeps_the_batch_structure():
+    batch = {'x': [torch.zeros(2), (torch.ones(1), 'meta')], 'y': 3}
+    batch = _apply_to_tensors(batch, lambda t: t + 1)
+
+    assert torch.equal(batch['x'][0], torch.ones(2))
+    assert isinstance(batch['x'][1], tuple)
+    assert torch.equal(batch['x'][1][0], torch.full((1,), 2.))
+    assert batch['x'][1][1] == 'meta'
+    assert batch['y'] == 3
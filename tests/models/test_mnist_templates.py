@@ -1,4 +1,6 @@
+import pytest
 import pytorch_lightning as pl
+import torch
 from argparse import Namespace
 
 from pl_bolts.models import LitMNISTModel
@@ -9,10 +11,34 @@ def test_mnist(tmpdir):
     reset_seed()
 
     model = LitMNISTModel(data_dir=tmpdir)
-    trainer = pl.Trainer(train_percent_check=0.01, val_percent_check=0.01, max_epochs=1,
-                         test_percent_check=0.01, default_root_dir=tmpdir)
+    trainer = pl.Trainer(limit_train_batches=0.01, limit_val_batches=0.01, max_epochs=1,
+                         limit_test_batches=0.01, default_root_dir=tmpdir)
     trainer.fit(model)
-    trainer.test(model)
-    loss = trainer.callback_metrics['loss']
+    loss = trainer.callback_metrics['train_loss']
 
     assert loss <= 2.0, 'mnist failed'
+
+    trainer.test(model)
+
+
+def test_mnist_returns_raw_logits():
+    reset_seed()
+
+    model = LitMNISTModel()
+    logits = model(torch.rand(8, 1, 28, 28))
+
+    # cross_entropy needs unbounded logits, a relu on the output layer would clip them at zero
+    assert logits.shape == (8, 10)
+    assert (logits < 0).any()
+
+
+@pytest.mark.skipif(not hasattr(torch, 'compile'), reason='torch.compile requires torch>=2.0')
+def test_mnist_compiled_forward(tmpdir):
+    reset_seed()
+
+    model = LitMNISTModel(data_dir=tmpdir)
+    model.forward = torch.compile(model.forward, mode='reduce-overhead', fullgraph=True)
+    trainer = pl.Trainer(limit_train_batches=0.01, limit_val_batches=0.01, max_epochs=1, default_root_dir=tmpdir)
+    trainer.fit(model)
+
+    assert trainer.callback_metrics['train_loss'] <= 2.0
@@ -1,4 +1,6 @@
+import pytest
 import pytorch_lightning as pl
+import torch
 from pl_bolts.models.self_supervised import CPCV2, AMDIM, SimCLR, MocoV2
 from tests import reset_seed
 from argparse import Namespace, ArgumentParser
@@ -10,7 +12,20 @@ def test_cpcv2(tmpdir):
     model = CPCV2(data_dir=tmpdir)
     trainer = pl.Trainer(overfit_batches=2, default_root_dir=tmpdir)
     trainer.fit(model)
-    loss = trainer.callback_metrics['loss']
+    loss = trainer.callback_metrics['train_nce_loss']
+
+    assert loss > 0
+
+
+@pytest.mark.skipif(not hasattr(torch, 'compile'), reason='torch.compile requires torch>=2.0')
+def test_cpcv2_compiled_forward(tmpdir):
+    reset_seed()
+
+    model = CPCV2(encoder='resnet18', data_dir=tmpdir, batch_size=2, num_workers=0)
+    model.forward = torch.compile(model.forward, dynamic=False)
+    trainer = pl.Trainer(overfit_batches=2, max_epochs=1, default_root_dir=tmpdir)
+    trainer.fit(model)
+    loss = trainer.callback_metrics['train_nce_loss']
 
     assert loss > 0
 
@@ -0,0 +1,15 @@
+import pytest
+import torch
+
+from pl_bolts.utils import optimizer_utils
+from pl_bolts.utils.optimizer_utils import fused_adam_kwargs
+
+
+@pytest.mark.skipif('fused' not in optimizer_utils._ADAM_PARAMETERS, reason='fused Adam requires torch>=1.13')
+def test_fused_adam_kwargs_clipping_falls_back_to_foreach():
+    assert fused_adam_kwargs('cuda') == {'fused': True}
+    assert fused_adam_kwargs('cuda', gradient_clip_val=0) == {'fused': True}
+
+    # the fused optimizer unscales its own gradients, which Lightning refuses to clip under 16-bit precision
+    assert fused_adam_kwargs('cuda', gradient_clip_val=0.5) == {'foreach': True}
+    assert fused_adam_kwargs(torch.device('cpu')) == {'foreach': True}